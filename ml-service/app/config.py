@@ -10,6 +10,22 @@ class Settings:
     MODEL_PATH = os.getenv("MODEL_PATH", "models/prep_time_predictor.pkl")
     MIN_TRAINING_SAMPLES = int(os.getenv("MIN_TRAINING_SAMPLES", "100"))
     TARGET_MAE_SECONDS = int(os.getenv("TARGET_MAE_SECONDS", "180"))
+    TUNING_BUDGET_SECONDS = int(os.getenv("TUNING_BUDGET_SECONDS", "300"))
+    TUNING_WORKERS = int(os.getenv("TUNING_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+    TUNING_TRIALS = int(os.getenv("TUNING_TRIALS", "27"))
+    PREDICT_DEADLINE_MS = int(os.getenv("PREDICT_DEADLINE_MS", "300"))
+    MAX_INFLIGHT_PREDICTIONS = int(os.getenv("MAX_INFLIGHT_PREDICTIONS", "64"))
+    WARMUP_PREDICTIONS = int(os.getenv("WARMUP_PREDICTIONS", "20"))
+    WARMUP_TIMEOUT_SECONDS = int(os.getenv("WARMUP_TIMEOUT_SECONDS", "60"))
+    CHALLENGER_MODEL_PATH = os.getenv("CHALLENGER_MODEL_PATH", "")
+    SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+    SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "64"))
+    SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+    SHADOW_CPU_FRACTION = float(os.getenv("SHADOW_CPU_FRACTION", "0.1"))
+    SHADOW_MAX_RECORDS = int(os.getenv("SHADOW_MAX_RECORDS", "10000"))
+    FALLBACK_TABLES_PATH = os.getenv("FALLBACK_TABLES_PATH", "models/fallback_tables.json")
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "60"))
     API_PORT = int(os.getenv("API_PORT", "8000"))
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
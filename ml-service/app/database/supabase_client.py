@@ -49,6 +49,7 @@ class SupabaseService:
                 .select("*") \
                 .gte("created_at", start_date) \
                 .in_("status", ["ready", "collected"]) \
+                .order("created_at") \
                 .execute()
                 
             orders_data = response.data
@@ -89,6 +90,22 @@ class SupabaseService:
         except Exception as e:
             return 0
 
+    def get_active_vendor_ids(self, minutes: int = 60):
+        if not HAS_SUPABASE or not self.client:
+            return [] # No vendors to preload in lite mode
+            
+        start_time = (datetime.now() - timedelta(minutes=minutes)).isoformat()
+        try:
+            response = self.client.table("orders") \
+                .select("vendor_id") \
+                .gte("created_at", start_time) \
+                .execute()
+                
+            return sorted({row["vendor_id"] for row in response.data or [] if row.get("vendor_id")})
+        except Exception as e:
+            logger.error(f"Error fetching active vendors: {e}")
+            return []
+
     def log_prediction(self, prediction_data: dict):
         if not HAS_SUPABASE or not self.client:
             # logger.info(f"[MOCK DB] Would insert: {prediction_data}")
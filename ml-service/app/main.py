@@ -1,15 +1,20 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import secrets
 import uvicorn
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.utils.logger import setup_logger
+from app.utils.profiler import profiler, tracer
 from app.services.prediction_service import PredictionService
 from app.services.training_service import TrainingService
+from app.services.shadow_service import shadow_service
 
 logger = setup_logger(__name__)
 
@@ -17,6 +22,30 @@ logger = setup_logger(__name__)
 prediction_service = PredictionService()
 training_service = TrainingService()
 
+def build_warmup_request(vendor_id: str, quantity: int) -> "PredictionRequest":
+    """
+    Synthetic order used to warm the prediction pipeline. No order_id, so nothing is persisted.
+    """
+    return PredictionRequest(
+        vendor_id=vendor_id,
+        items=[OrderItemInput(menu_item_id="warmup", quantity=quantity,
+                              base_preparation_time_minutes=5.0, preparation_complexity=2)],
+        total_base_time_minutes=5.0 * quantity,
+        max_complexity=2,
+        total_items=quantity
+    )
+
+async def warm_up():
+    try:
+        await asyncio.wait_for(
+            prediction_service.warm_up(build_warmup_request),
+            timeout=settings.WARMUP_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        # Fallback paths still work; a failed warm-up must not keep the worker out of rotation
+        logger.warning(f"Warm-up did not complete: {e!r}. Marking ready anyway.")
+        prediction_service.ready = True
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Load model
@@ -25,9 +54,14 @@ async def lifespan(app: FastAPI):
         prediction_service.load_model()
     except Exception as e:
         logger.warning(f"Could not load model on startup: {e}. Running in fallback-only mode.")
+    shadow_service.start()
+    # Warm up in the background so /health (liveness) answers while /ready stays false
+    warmup_task = asyncio.create_task(warm_up())
     yield
     # Shutdown
     logger.info("Shutting down ML Service...")
+    warmup_task.cancel()
+    shadow_service.stop()
 
 app = FastAPI(
     title="Campus Food Prediction API",
@@ -69,11 +103,19 @@ class PredictionResponse(BaseModel):
     method: str 
     rush_detected: bool
 
+class ActualReadyTimeInput(BaseModel):
+    order_id: str
+    actual_ready_time: datetime
+
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
     version: str
 
+class ReadinessResponse(BaseModel):
+    ready: bool
+    model_loaded: bool
+
 # --- Endpoints ---
 
 @app.post("/predict", response_model=PredictionResponse)
@@ -85,8 +127,9 @@ async def predict_order_ready_time(request: PredictionRequest):
     try:
         start_time = datetime.now()
         
-        # Call prediction service
-        result = await prediction_service.predict(request)
+        # Call prediction service (traced only when sampled)
+        with tracer.trace("predict"):
+            result = await prediction_service.predict(request)
         
         process_time = (datetime.now() - start_time).total_seconds() * 1000
         logger.info(f"Prediction processed in {process_time:.2f}ms using {result['method']}")
@@ -111,11 +154,12 @@ async def predict_order_ready_time(request: PredictionRequest):
         }
 
 @app.post("/train")
-async def trigger_training(background_tasks: BackgroundTasks):
+async def trigger_training(background_tasks: BackgroundTasks, tune: bool = False):
     """
     Trigger model retraining in the background.
+    Pass ?tune=true to run the time-budgeted hyperparameter search instead.
     """
-    background_tasks.add_task(training_service.train_model)
+    background_tasks.add_task(training_service.train_model, tune)
     return {"message": "Training task started in background", "status": "processing"}
 
 @app.get("/metrics")
@@ -125,6 +169,80 @@ async def get_model_metrics():
     """
     return training_service.get_latest_metrics()
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Admin endpoints are disabled unless ADMIN_TOKEN is set.
+    """
+    if not settings.ADMIN_TOKEN or not x_admin_token or \
+            not secrets.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.post("/shadow/actuals", dependencies=[Depends(require_admin)])
+async def record_actual_ready_time(actual: ActualReadyTimeInput):
+    """
+    Report when an order was actually ready, so shadow error stats can be computed.
+    Admin-only: untrusted actuals would skew the champion/challenger comparison.
+    """
+    recorded = shadow_service.record_actual(actual.order_id, actual.actual_ready_time)
+    return {"order_id": actual.order_id, "recorded": recorded}
+
+@app.get("/shadow/metrics")
+async def get_shadow_metrics():
+    """
+    Champion vs challenger error on sampled live orders with known ready times.
+    Records live in memory only and are lost on restart.
+    """
+    return shadow_service.get_metrics()
+
+# --- Admin: profiling & tracing ---
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def start_profiling(seconds: float = 10.0, interval_ms: float = 5.0):
+    """
+    Run the sampling profiler for `seconds` (max PROFILER_MAX_SECONDS).
+    """
+    seconds = min(max(seconds, 0.1), settings.PROFILER_MAX_SECONDS)
+    if not profiler.start(seconds, max(interval_ms, 1.0)):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return profiler.status()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile(format: str = "collapsed"):
+    """
+    Aggregated stacks of the last profiling session, in collapsed-stack format
+    (one `frame;frame;frame count` per line). format=status returns progress only.
+    """
+    if format == "status":
+        return profiler.status()
+    if profiler.running:
+        # The sampler thread is still writing the counts
+        raise HTTPException(status_code=409, detail="Profiler still running; stop it or wait")
+    return PlainTextResponse(profiler.collapsed())
+
+@app.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def stop_profiling():
+    """
+    Stop the running profiling session early; its stacks stay downloadable.
+    """
+    if not profiler.stop():
+        raise HTTPException(status_code=409, detail="Profiler not running")
+    return profiler.status()
+
+@app.post("/admin/trace", dependencies=[Depends(require_admin)])
+async def configure_tracing(sample_rate: float = 0.0, max_traces: int = Query(100, ge=1)):
+    """
+    Trace a fraction of /predict requests with nested span timings. sample_rate=0 turns it off.
+    """
+    tracer.configure(sample_rate, max_traces)
+    return {"sample_rate": tracer.sample_rate, "max_traces": tracer.finished.maxlen}
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+async def get_traces():
+    """
+    Most recent sampled request traces.
+    """
+    return tracer.traces()
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
@@ -136,5 +254,18 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """
+    Readiness probe. Returns 503 until startup warm-up has finished.
+    """
+    body = {
+        "ready": prediction_service.ready,
+        "model_loaded": prediction_service.model.model is not None
+    }
+    if not prediction_service.ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=settings.API_PORT, reload=True)
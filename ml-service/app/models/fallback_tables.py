@@ -0,0 +1,238 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import pandas as pd
+    import numpy as np
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+from app.config import settings
+from app.models.feature_engineer import FEATURE_DEFAULTS, LUNCH_RUSH_HOURS, to_local_time
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HOURS_PER_WEEK = 168
+QUEUE_SLOTS = 30  # Depths beyond this are extrapolated linearly
+
+# Pre-calibration behaviour: 2.5 min per queued order, 1.4x during the lunch rush
+DEFAULT_MINUTES_PER_QUEUED_ORDER = 2.5
+DEFAULT_LUNCH_MULTIPLIER = 1.4
+
+def hour_of_week(timestamp: datetime) -> int:
+    return timestamp.weekday() * 24 + timestamp.hour
+
+def default_hour_multipliers() -> List[float]:
+    return [DEFAULT_LUNCH_MULTIPLIER if LUNCH_RUSH_HOURS[0] <= h % 24 <= LUNCH_RUSH_HOURS[1] else 1.0
+            for h in range(HOURS_PER_WEEK)]
+
+def default_queue_delays() -> List[float]:
+    return [slot * DEFAULT_MINUTES_PER_QUEUED_ORDER for slot in range(QUEUE_SLOTS)]
+
+def base_time_from_items(items) -> float:
+    """
+    Sum of base_preparation_time_minutes * quantity over an order's items, as /predict does.
+    """
+    if not isinstance(items, list):
+        return float("nan")
+    return float(sum(
+        (item.get("base_preparation_time_minutes") or 0) * (item.get("quantity") or 0) for item in items
+    ))
+
+def rebuild_queue_depth(vendor_ids, created_at, ready_at):
+    """
+    Queue depth each order saw when it was placed: the same vendor's orders created
+    before it and not yet ready at that time. Only counts orders present in the frame.
+    """
+    depth = np.zeros(len(created_at), dtype=int)
+    created = created_at.to_numpy(dtype="datetime64[ns]")
+    ready = ready_at.to_numpy(dtype="datetime64[ns]")
+    for positions in vendor_ids.groupby(vendor_ids.to_numpy()).indices.values():
+        vendor_created = np.sort(created[positions])
+        vendor_ready = np.sort(ready[positions][~np.isnat(ready[positions])])
+        # created before t minus ready by t (ready >= created, so those were created before t too)
+        placed = np.searchsorted(vendor_created, created[positions], side="left")
+        done = np.searchsorted(vendor_ready, created[positions], side="right")
+        depth[positions] = np.clip(placed - done, 0, None)
+    return depth
+
+class FallbackTables:
+    """
+    Precomputed lookup tables for the rule-based estimate:
+        minutes = (base_time + queue_delay[vendor][depth]) * multiplier[vendor][hour_of_week]
+    Lookups are O(1) list indexing with no ML dependency. Tables are fitted in bulk from
+    history (pandas required) and persisted as JSON so Lite Mode can load them.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or settings.FALLBACK_TABLES_PATH
+        self.hour_multipliers: List[float] = default_hour_multipliers()
+        self.queue_delays: List[float] = default_queue_delays()
+        self.vendor_hour_multipliers: Dict[str, List[float]] = {}
+        self.vendor_queue_delays: Dict[str, List[float]] = {}
+        self.calibrated = False
+
+    def estimate(self, vendor_id: str, base_time: float, vendor_load: int, timestamp: datetime = None) -> float:
+        timestamp = timestamp or datetime.now()
+        multipliers = self.vendor_hour_multipliers.get(vendor_id, self.hour_multipliers)
+        delays = self.vendor_queue_delays.get(vendor_id, self.queue_delays)
+        return (base_time + self._queue_delay(delays, vendor_load)) * multipliers[hour_of_week(timestamp)]
+
+    @staticmethod
+    def _queue_delay(delays: List[float], depth: int) -> float:
+        depth = max(int(depth), 0)
+        last = len(delays) - 1
+        if depth <= last:
+            return delays[depth]
+        per_slot = delays[last] / last if last > 0 else DEFAULT_MINUTES_PER_QUEUED_ORDER
+        return delays[last] + (depth - last) * per_slot
+
+    def fit(self, history, min_samples: int = 20, iterations: int = 3) -> Dict:
+        """
+        Learn the tables from completed orders. Needs columns vendor_id, created_at and
+        either actual_minutes or actual_ready_time. Plain order rows lack the feature
+        columns, so total_base_time_minutes falls back to the order's items and
+        vendor_queue_depth is rebuilt from the orders themselves. Timestamps are compared
+        in local time, like estimate(). Sparse cells are shrunk towards their parent
+        table (vendor -> global -> default) with weight min_samples.
+        Fit a fresh instance and publish it with set_fallback_tables(); never fit the
+        active one, since requests read it concurrently.
+        """
+        if not HAS_PANDAS:
+            raise RuntimeError("Fitting fallback tables requires pandas")
+
+        created_at = to_local_time(history["created_at"])
+        vendor_ids = history["vendor_id"].astype(str)
+        if "actual_minutes" in history:
+            actual = pd.to_numeric(history["actual_minutes"], errors="coerce")
+            ready_at = created_at + pd.to_timedelta(actual, unit="m")
+        else:
+            ready_at = to_local_time(history["actual_ready_time"])
+            actual = (ready_at - created_at).dt.total_seconds() / 60.0
+
+        if "total_base_time_minutes" in history:
+            base = pd.to_numeric(history["total_base_time_minutes"], errors="coerce")
+        elif "items" in history:
+            base = history["items"].map(base_time_from_items)
+        else:
+            base = pd.Series(FEATURE_DEFAULTS["total_base_time_minutes"], index=history.index)
+
+        if "vendor_queue_depth" in history:
+            depth = pd.to_numeric(history["vendor_queue_depth"], errors="coerce")
+        else:
+            depth = pd.Series(rebuild_queue_depth(vendor_ids, created_at, ready_at), index=history.index)
+
+        df = pd.DataFrame({
+            "vendor_id": vendor_ids,
+            "how": created_at.dt.weekday * 24 + created_at.dt.hour,
+            "base": base,
+            "depth": depth.clip(0, QUEUE_SLOTS - 1),
+            "actual": actual,
+        })
+        df = df.dropna()
+        df = df[(df["actual"] > 0) & (df["base"] >= 0)]
+        df["depth"] = df["depth"].astype(int)
+        if len(df) < min_samples:
+            logger.warning(f"Only {len(df)} usable rows; keeping current fallback tables.")
+            return {"status": "skipped", "reason": "insufficient_data", "samples": len(df)}
+
+        k = float(min_samples)
+        hour_mult = np.array(default_hour_multipliers())
+        delays = np.array(default_queue_delays())
+        # Vendors with little history just use the global tables
+        vendor_counts = df["vendor_id"].value_counts()
+        vendors = vendor_counts[vendor_counts >= min_samples].index
+
+        # Alternate: fix multipliers -> fit delays, fix delays -> fit multipliers
+        for _ in range(iterations):
+            df["mult"] = hour_mult[df["how"].values]
+            residual = (df["actual"] / df["mult"] - df["base"]).rename("residual")
+            stats = residual.groupby(df["depth"]).agg(["median", "count"])
+            fitted = delays.copy()
+            fitted[stats.index] = (stats["median"] * stats["count"] + delays[stats.index] * k) / (stats["count"] + k)
+            # More orders ahead never means less waiting
+            delays = np.maximum.accumulate(np.clip(fitted, 0, None))
+
+            ratio = (df["actual"] / (df["base"] + delays[df["depth"].values])).replace([np.inf], np.nan).dropna()
+            stats = ratio.groupby(df["how"]).agg(["median", "count"])
+            fitted = hour_mult.copy()
+            fitted[stats.index] = (stats["median"] * stats["count"] + hour_mult[stats.index] * k) / (stats["count"] + k)
+            hour_mult = np.clip(fitted, 0.5, 3.0)
+
+        vendor_hour_mult, vendor_delays = {}, {}
+        df["mult"] = hour_mult[df["how"].values]
+        df["residual"] = df["actual"] / df["mult"] - df["base"]
+        grouped_delays = df.groupby(["vendor_id", "depth"])["residual"].agg(["median", "count"])
+        df["ratio"] = (df["actual"] / (df["base"] + delays[df["depth"].values])).replace([np.inf], np.nan)
+        grouped_ratio = df.dropna(subset=["ratio"]).groupby(["vendor_id", "how"])["ratio"].agg(["median", "count"])
+
+        for vendor in vendors:
+            v_delays = delays.copy()
+            stats = grouped_delays.loc[vendor]
+            v_delays[stats.index] = (stats["median"] * stats["count"] + delays[stats.index] * k) / (stats["count"] + k)
+            vendor_delays[vendor] = np.maximum.accumulate(np.clip(v_delays, 0, None))
+
+            v_mult = hour_mult.copy()
+            if vendor not in grouped_ratio.index.get_level_values(0):
+                vendor_hour_mult[vendor] = v_mult
+                continue
+            stats = grouped_ratio.loc[vendor]
+            v_mult[stats.index] = (stats["median"] * stats["count"] + hour_mult[stats.index] * k) / (stats["count"] + k)
+            vendor_hour_mult[vendor] = np.clip(v_mult, 0.5, 3.0)
+
+        self.hour_multipliers = [round(float(x), 3) for x in hour_mult]
+        self.queue_delays = [round(float(x), 3) for x in delays]
+        self.vendor_hour_multipliers = {v: [round(float(x), 3) for x in m] for v, m in vendor_hour_mult.items()}
+        self.vendor_queue_delays = {v: [round(float(x), 3) for x in d] for v, d in vendor_delays.items()}
+        self.calibrated = True
+
+        estimates = (df["base"] + delays[df["depth"].values]) * hour_mult[df["how"].values]
+        mae = float((estimates - df["actual"]).abs().mean())
+        logger.info(f"Fallback tables fitted on {len(df)} orders, {len(vendors)} vendor tables. Global MAE: {mae:.2f}")
+        return {"status": "success", "samples": len(df), "vendors": len(vendors), "global_mae": mae}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump({
+                    "hour_multipliers": self.hour_multipliers,
+                    "queue_delays": self.queue_delays,
+                    "vendor_hour_multipliers": self.vendor_hour_multipliers,
+                    "vendor_queue_delays": self.vendor_queue_delays,
+                }, f, separators=(",", ":"))
+            logger.info(f"Fallback tables saved to {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to save fallback tables: {e}")
+
+    def load(self) -> bool:
+        try:
+            if not os.path.exists(self.path):
+                logger.info(f"No fallback tables at {self.path}; using default rules.")
+                return False
+            with open(self.path) as f:
+                data = json.load(f)
+            self.hour_multipliers = data["hour_multipliers"]
+            self.queue_delays = data["queue_delays"]
+            self.vendor_hour_multipliers = data.get("vendor_hour_multipliers", {})
+            self.vendor_queue_delays = data.get("vendor_queue_delays", {})
+            self.calibrated = True
+            logger.info(f"Fallback tables loaded from {self.path} ({len(self.vendor_hour_multipliers)} vendors)")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load fallback tables: {e}")
+            return False
+
+# Tables served by calculate_rule_based. Replaced wholesale (one assignment) so
+# concurrent readers always see a consistent set of tables.
+_active_tables = FallbackTables()
+
+def get_fallback_tables() -> FallbackTables:
+    return _active_tables
+
+def set_fallback_tables(tables: FallbackTables):
+    global _active_tables
+    _active_tables = tables
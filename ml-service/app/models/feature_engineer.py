@@ -20,6 +20,47 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Rush hour windows (inclusive hours of day, local time)
+LUNCH_RUSH_HOURS = (11, 13)
+DINNER_RUSH_HOURS = (16, 17)
+
+# Column order the model is trained and served with
+FEATURE_COLUMNS = [
+    "total_base_time_minutes",
+    "max_complexity",
+    "total_items",
+    "vendor_queue_depth",
+    "recent_order_velocity",
+    "vendor_avg_rate",
+    "vendor_max_concurrent",
+    "hour_of_day",
+    "day_of_week",
+    "is_lunch_rush",
+    "is_dinner_rush",
+]
+
+# Fallbacks for historical rows that lack a column
+FEATURE_DEFAULTS = {
+    "total_base_time_minutes": 0.0,
+    "max_complexity": 1,
+    "total_items": 1,
+    "vendor_queue_depth": 0,
+    "recent_order_velocity": 0,
+    "vendor_avg_rate": 2.0,
+    "vendor_max_concurrent": 10,
+}
+
+def to_local_time(timestamps):
+    """
+    Parse a column of timestamps as naive local time (what datetime.now() returns).
+    Timezone-aware values (e.g. UTC from the database) are converted first.
+    """
+    timestamps = pd.to_datetime(timestamps)
+    if timestamps.dt.tz is not None:
+        from dateutil import tz
+        timestamps = timestamps.dt.tz_convert(tz.tzlocal()).dt.tz_localize(None)
+    return timestamps
+
 class FeatureEngineer:
     def __init__(self):
         pass
@@ -31,9 +72,9 @@ class FeatureEngineer:
         hour = timestamp.hour
         day_of_week = timestamp.weekday()
         
-        # Rush hour flags (11-13, 16-17)
-        is_lunch_rush = 1 if 11 <= hour <= 13 else 0
-        is_dinner_rush = 1 if 16 <= hour <= 17 else 0
+        # Rush hour flags
+        is_lunch_rush = 1 if LUNCH_RUSH_HOURS[0] <= hour <= LUNCH_RUSH_HOURS[1] else 0
+        is_dinner_rush = 1 if DINNER_RUSH_HOURS[0] <= hour <= DINNER_RUSH_HOURS[1] else 0
         
         return {
             "hour_of_day": hour,
@@ -71,9 +112,34 @@ class FeatureEngineer:
         }
         
         if HAS_PANDAS:
-            return pd.DataFrame([features])
+            return pd.DataFrame([features], columns=FEATURE_COLUMNS)
         return features # Return raw dict in Lite mode
 
+    def create_features_batch(self, orders):
+        """
+        Vectorized equivalent of create_features_for_prediction for a DataFrame of
+        historical orders, with time features taken from `created_at` instead of now.
+        Timezone-aware timestamps are converted to local time, as the live path uses.
+        """
+        if not HAS_PANDAS:
+            raise RuntimeError("Batch feature engineering requires pandas")
+
+        features = pd.DataFrame(index=orders.index)
+        for column, default in FEATURE_DEFAULTS.items():
+            if column in orders:
+                features[column] = pd.to_numeric(orders[column], errors="coerce").fillna(default)
+            else:
+                features[column] = default
+
+        created_at = to_local_time(orders["created_at"])
+        hour = created_at.dt.hour
+        features["hour_of_day"] = hour
+        features["day_of_week"] = created_at.dt.weekday
+        features["is_lunch_rush"] = hour.between(*LUNCH_RUSH_HOURS).astype(int)
+        features["is_dinner_rush"] = hour.between(*DINNER_RUSH_HOURS).astype(int)
+
+        return features[FEATURE_COLUMNS]
+
     def preprocess_training_data(self, raw_data):
         """
         Transform raw data into features.
@@ -0,0 +1,211 @@
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any
+
+try:
+    import xgboost as xgb
+    import numpy as np
+    HAS_ML = True
+except ImportError:
+    HAS_ML = False
+
+from app.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per-process data cache. Filled once by the pool initializer so each trial
+# reuses the same prepared matrices instead of re-pickling them per task.
+_DATA: Dict[str, Any] = {}
+
+if HAS_ML:
+    class DeadlineCallback(xgb.callback.TrainingCallback):
+        """
+        Stop boosting once the search's wall-clock deadline has passed, so running
+        trials do not outlive the budget.
+        """
+        def __init__(self, deadline: float):
+            super().__init__()
+            self.deadline = deadline
+            self.hit = False
+
+        def after_iteration(self, model, epoch, evals_log) -> bool:
+            if time.time() >= self.deadline:
+                self.hit = True
+                return True
+            return False
+
+def _init_worker(X_train, y_train, X_val, y_val):
+    _DATA["X_train"] = X_train.astype("float32")
+    _DATA["y_train"] = np.asarray(y_train, dtype="float32")
+    _DATA["X_val"] = X_val.astype("float32")
+    _DATA["y_val"] = np.asarray(y_val, dtype="float32")
+
+def measure_inference_ms(model, X_row, repeats: int = 50) -> float:
+    """
+    Median latency (ms) of a single-row predict, i.e. the /predict hot path.
+    """
+    model.predict(X_row)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict(X_row)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def _run_trial(trial_id: int, params: Dict[str, Any], n_estimators: int, deadline: float) -> Dict[str, Any]:
+    """
+    Fit one configuration with early stopping on the time-ordered validation split.
+    Runs inside a pool worker; `deadline` is a time.time() value shared with the parent.
+    """
+    X_train, y_train = _DATA["X_train"], _DATA["y_train"]
+    X_val, y_val = _DATA["X_val"], _DATA["y_val"]
+
+    start = time.perf_counter()
+    deadline_callback = DeadlineCallback(deadline)
+    model = xgb.XGBRegressor(
+        objective='reg:squarederror',
+        tree_method='hist',
+        n_estimators=n_estimators,
+        early_stopping_rounds=20,
+        n_jobs=1,  # Parallelism comes from the pool, not from xgboost
+        callbacks=[deadline_callback],
+        **params
+    )
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    fit_seconds = time.perf_counter() - start
+
+    predictions = model.predict(X_val)
+    mae = float(np.mean(np.abs(predictions - y_val)))
+    best_iteration = getattr(model, "best_iteration", None)
+    n_trees = (best_iteration + 1) if best_iteration is not None else n_estimators
+
+    return {
+        "trial_id": trial_id,
+        "params": params,
+        "n_estimators": n_estimators,
+        "n_trees": int(n_trees),
+        "mae": mae,
+        "fit_seconds": fit_seconds,
+        "stopped_at_deadline": deadline_callback.hit,
+        "inference_ms": measure_inference_ms(model, X_val.iloc[:1]),
+        "model": model,
+    }
+
+def sample_params(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "max_depth": rng.randint(2, 8),
+        "learning_rate": math.exp(rng.uniform(math.log(0.03), math.log(0.3))),
+        "subsample": rng.uniform(0.6, 1.0),
+        "colsample_bytree": rng.uniform(0.6, 1.0),
+        "min_child_weight": rng.randint(1, 10),
+        "max_bin": rng.choice([64, 128, 256]),
+    }
+
+class HyperparameterSearch:
+    """
+    Successive-halving search over XGBoost configs on a process pool,
+    bounded by a wall-clock budget.
+    """
+    def __init__(self,
+                 budget_seconds: int = None,
+                 n_workers: int = None,
+                 n_trials: int = None,
+                 min_estimators: int = 50,
+                 eta: int = 3,
+                 target_mae_minutes: float = None,
+                 seed: int = 42):
+        self.budget_seconds = budget_seconds or settings.TUNING_BUDGET_SECONDS
+        self.n_workers = n_workers or settings.TUNING_WORKERS
+        self.n_trials = n_trials or settings.TUNING_TRIALS
+        self.min_estimators = min_estimators
+        self.eta = eta
+        self.target_mae_minutes = target_mae_minutes or settings.TARGET_MAE_SECONDS / 60.0
+        self.rng = random.Random(seed)
+
+    def time_ordered_split(self, X, y, val_fraction: float = 0.2):
+        """
+        Hold out the most recent rows for validation. X must be in chronological order.
+        """
+        split = int(len(X) * (1 - val_fraction))
+        return X.iloc[:split], y.iloc[:split], X.iloc[split:], y.iloc[split:]
+
+    def run(self, X, y) -> Dict[str, Any]:
+        if not HAS_ML:
+            logger.warning("ML libraries missing: Cannot tune model. Skipping.")
+            return {"status": "skipped", "reason": "missing_dependencies"}
+
+        X_train, y_train, X_val, y_val = self.time_ordered_split(X, y)
+        # Wall-clock (not monotonic) so worker processes can compare against it
+        deadline = time.time() + self.budget_seconds
+        configs = {i: sample_params(self.rng) for i in range(self.n_trials)}
+        results: List[Dict[str, Any]] = []
+        n_estimators = self.min_estimators
+        budget_exhausted = False
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(X_train, y_train, X_val, y_val),
+            # The serving process is multi-threaded (threadpool, shadow scorer, profiler);
+            # forking it with xgboost/OpenMP loaded can deadlock
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            while configs and not budget_exhausted:
+                futures = {
+                    pool.submit(_run_trial, trial_id, params, n_estimators, deadline)
+                    for trial_id, params in configs.items()
+                }
+                rung_results = []
+                while futures:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        budget_exhausted = True
+                        break
+                    done, futures = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            rung_results.append(future.result())
+                        except Exception as e:
+                            logger.warning(f"Tuning trial failed: {e}")
+
+                results.extend(rung_results)
+                logger.info(f"Rung n_estimators={n_estimators}: {len(rung_results)} trials completed")
+
+                # Promote the best 1/eta to the next rung with eta times the trees
+                keep = len(configs) // self.eta
+                if keep < 1:
+                    break
+                rung_results.sort(key=lambda r: r["mae"])
+                configs = {r["trial_id"]: r["params"] for r in rung_results[:keep]}
+                n_estimators *= self.eta
+        finally:
+            # Queued trials are cancelled; running ones stop at the deadline via
+            # DeadlineCallback, so waiting here is bounded by one boosting round.
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if not results:
+            return {"status": "failed", "reason": "no_trials_completed", "budget_exhausted": budget_exhausted}
+
+        best = self.select(results)
+        return {
+            "status": "success",
+            "best": best,
+            "budget_exhausted": budget_exhausted,
+            "candidates": [{k: v for k, v in r.items() if k != "model"} for r in results],
+        }
+
+    def select(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Cheapest-to-evaluate model that meets the MAE target, else the most accurate one.
+        """
+        meeting_target = [r for r in results if r["mae"] <= self.target_mae_minutes]
+        if meeting_target:
+            return min(meeting_target, key=lambda r: (r["inference_ms"], r["n_trees"], r["mae"]))
+        logger.warning(f"No candidate met target MAE {self.target_mae_minutes:.2f}; using most accurate.")
+        return min(results, key=lambda r: r["mae"])
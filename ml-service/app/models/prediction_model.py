@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Tuple, Any
+from typing import Tuple, Any, List
 
 try:
     import xgboost as xgb
@@ -16,9 +16,9 @@ from app.utils.logger import setup_logger
 logger = setup_logger(__name__)
 
 class PredictionModel:
-    def __init__(self):
+    def __init__(self, model_path: str = None):
         self.model = None
-        self.model_path = settings.MODEL_PATH
+        self.model_path = model_path or settings.MODEL_PATH
         
     def train(self, X, y) -> dict:
         """
@@ -66,6 +66,47 @@ class PredictionModel:
             logger.error(f"Training failed: {e}")
             raise
 
+    def tune(self, X, y) -> dict:
+        """
+        Hyperparameter search (successive halving, time-budgeted).
+        X, y must be in chronological order; the newest 20% is the validation split.
+        """
+        if not HAS_ML:
+            logger.warning("ML libraries missing: Cannot tune model. Skipping.")
+            return {"status": "skipped", "reason": "missing_dependencies"}
+
+        if hasattr(X, 'empty') and X.empty:
+            return {}
+
+        from app.models.hyperparameter_search import HyperparameterSearch
+
+        search = HyperparameterSearch().run(X, y)
+        if search.get("status") != "success":
+            return search
+
+        best = search["best"]
+        # Drop search-only settings: the (expired) deadline callback and early stopping,
+        # which would break refits and tie the pickle to the search module
+        best["model"].set_params(callbacks=None, early_stopping_rounds=None)
+        self.model = best["model"]
+        logger.info(
+            f"Tuned model selected. MAE: {best['mae']:.2f}, trees: {best['n_trees']}, "
+            f"inference: {best['inference_ms']:.3f}ms ({len(search['candidates'])} candidates)"
+        )
+        self.save_model()
+
+        return {
+            "mae": best["mae"],
+            # Same split drove early stopping and candidate selection, so this is optimistic
+            "mae_note": "validation MAE; optimistic (split also used for early stopping and selection)",
+            "samples": len(X),
+            "params": best["params"],
+            "n_trees": best["n_trees"],
+            "inference_ms": best["inference_ms"],
+            "budget_exhausted": search["budget_exhausted"],
+            "candidates": search["candidates"],
+        }
+
     def predict(self, X) -> Tuple[float, float]:
         """
         Predict wait time.
@@ -83,6 +124,15 @@ class PredictionModel:
             logger.error(f"Prediction failed: {e}")
             raise
 
+    def predict_batch(self, X) -> List[float]:
+        """
+        Vectorized prediction for many rows (minutes, floored at 1.0 like predict).
+        """
+        if not HAS_ML or not self.model:
+            raise ValueError("Model not loaded or ML unavailable")
+
+        return [max(float(p), 1.0) for p in self.model.predict(X)]
+
     def save_model(self):
         if not HAS_ML: return
         try:
@@ -1,27 +1,98 @@
 from datetime import datetime
 from starlette.concurrency import run_in_threadpool
+import asyncio
 import logging
+import time
 
 from app.models.prediction_model import prediction_model
-from app.models.feature_engineer import feature_engineer
+from app.models.feature_engineer import feature_engineer, LUNCH_RUSH_HOURS, DINNER_RUSH_HOURS
+from app.models.fallback_tables import FallbackTables, get_fallback_tables, set_fallback_tables
 from app.database.supabase_client import supabase_service
+from app.services.shadow_service import shadow_service
 from app.config import settings
+from app.utils.profiler import tracer
 
 logger = logging.getLogger(__name__)
 
 class PredictionService:
+    # Even when the inference estimate says the model would miss the deadline,
+    # let one request per interval run it so the estimate can recover from a stall.
+    INFERENCE_PROBE_INTERVAL_SECONDS = 1.0
+    # The inference estimate may reserve at most this share of the fetch budget
+    MAX_INFERENCE_RESERVE_FRACTION = 0.5
+
+    DEFAULT_VENDOR_METRICS = {
+        "avg_order_fulfillment_rate": 2.0, # Default
+        "max_concurrent_orders": 10
+    }
+
     def __init__(self):
         self.model = prediction_model
+        # Admission control state (single event loop, so no locking needed)
+        self.inflight = 0
+        self.deadline_seconds = settings.PREDICT_DEADLINE_MS / 1000.0
+        # Last known (vendor_load, recent_velocity) per vendor, served when degraded
+        self.context_cache = {}
+        # One outstanding context fetch per vendor; late results still refresh the cache
+        self.pending_fetches = {}
+        # EWMA of model inference time, used to decide if inference fits the budget
+        self.inference_seconds_ewma = 0.0
+        self.last_inference_probe = 0.0
+        # Flipped by warm_up(); exposed via /ready
+        self.ready = False
         
     def load_model(self):
         """
         Load the trained model from disk.
         """
         self.model.load_model()
+        tables = FallbackTables()
+        if tables.load():
+            set_fallback_tables(tables)
+
+    async def warm_up(self, build_request, n_predictions=None):
+        """
+        Pay first-call costs before taking traffic.
+        1. Preload context for active vendors (also opens pooled DB connections).
+        2. Run synthetic predictions through the full pipeline.
+        3. Exercise the model and rule-based paths directly, in case 2 degraded.
+        build_request(vendor_id, quantity) returns a PredictionRequest.
+        """
+        n_predictions = n_predictions or settings.WARMUP_PREDICTIONS
+        start = time.monotonic()
+
+        vendor_ids = await run_in_threadpool(supabase_service.get_active_vendor_ids)
+        await asyncio.gather(*(self.fetch_context(v) for v in vendor_ids), return_exceptions=True)
+        logger.info(f"Warm-up: preloaded context for {len(vendor_ids)} vendors")
+
+        sample_vendors = vendor_ids or ["warmup"]
+        for i in range(n_predictions):
+            request_data = build_request(sample_vendors[i % len(sample_vendors)], 1 + i % 5)
+            await self.predict(request_data)
+
+            features_df = feature_engineer.create_features_for_prediction(
+                [item.dict() for item in request_data.items], 0, self.DEFAULT_VENDOR_METRICS, 0
+            )
+            if self.model.model is not None:
+                inference_start = time.monotonic()
+                self.model.predict(features_df)
+                warm_inference_seconds = time.monotonic() - inference_start
+            self.calculate_rule_based(request_data, 0)
+
+        if self.model.model is not None and n_predictions > 0:
+            # Cold first calls would otherwise inflate the estimate and degrade real traffic
+            self.inference_seconds_ewma = warm_inference_seconds
+
+        # Synthetic vendors must not be served as real cached context
+        self.context_cache.pop("warmup", None)
+        self.ready = True
+        logger.info(f"Warm-up completed in {time.monotonic() - start:.2f}s; service is ready")
 
     async def predict(self, request_data):
         """
         Main prediction logic.
+        0. Admission control: shed to rules when over the in-flight limit
+           or when context/inference would miss PREDICT_DEADLINE_MS.
         1. Fetch context (vendor load, velocity).
         2. Engineer features.
         3. Try ML model.
@@ -29,14 +100,31 @@ class PredictionService:
         5. Log result.
         """
         start_time = datetime.now()
+        deadline = time.monotonic() + self.deadline_seconds
         
         # 1. Fetch Context (IO bound, run in threadpool)
         # We need vendor load and recent velocity
         vendor_id = request_data.vendor_id
+
+        # 0. Admission control: past the in-flight limit, answer from cache + rules only
+        if self.inflight >= settings.MAX_INFLIGHT_PREDICTIONS:
+            return self.degraded_prediction(request_data, start_time, "rule_based_load_shed")
         
+        self.inflight += 1
         try:
-            vendor_load = await run_in_threadpool(supabase_service.get_vendor_load, vendor_id)
-            recent_velocity = await run_in_threadpool(supabase_service.get_recent_order_velocity, vendor_id)
+            # Leave room for inference inside the budget
+            inference_reserve = min(self.inference_seconds_ewma,
+                                    self.deadline_seconds * self.MAX_INFERENCE_RESERVE_FRACTION)
+            fetch_timeout = deadline - time.monotonic() - inference_reserve
+            try:
+                with tracer.span("fetch_context"):
+                    vendor_load, recent_velocity = await asyncio.wait_for(
+                        asyncio.shield(self.fetch_context(vendor_id)),
+                        timeout=max(fetch_timeout, 0.0)
+                    )
+            except asyncio.TimeoutError:
+                logger.warning(f"Context fetch for {vendor_id} missed the deadline, degrading.")
+                return self.degraded_prediction(request_data, start_time, "rule_based_deadline")
             
             # 2. Engineer Features
             # We need to reshape the request data into what feature_engineer expects
@@ -49,27 +137,34 @@ class PredictionService:
             # For speed, let's assume defaults or use what we have. 
             # supabase_service.get_vendor_load doesn't return max_capacity.
             # We'll use defaults for now to save a DB call or implement a cache later.
-            vendor_metrics = {
-                "avg_order_fulfillment_rate": 2.0, # Default
-                "max_concurrent_orders": 10
-            }
+            vendor_metrics = self.DEFAULT_VENDOR_METRICS
             
-            features_df = feature_engineer.create_features_for_prediction(
-                items_dicts,
-                vendor_load,
-                vendor_metrics,
-                recent_velocity
-            )
+            with tracer.span("feature_engineering"):
+                features_df = feature_engineer.create_features_for_prediction(
+                    items_dicts,
+                    vendor_load,
+                    vendor_metrics,
+                    recent_velocity
+                )
             
             # 3. Model Prediction
             predicted_minutes = 0.0
             confidence = 0.0
             method = "rule_based_fallback"
             
-            if self.model.model is not None:
+            if self.model.model is not None and time.monotonic() + self.inference_seconds_ewma > deadline \
+                    and not self.should_probe_inference():
+                # Inference would miss the deadline
+                predicted_minutes = self.calculate_rule_based(request_data, vendor_load)
+                confidence = 0.4
+                method = "rule_based_deadline"
+            elif self.model.model is not None:
                 try:
                     # ML Prediction
-                    predicted_minutes, confidence = self.model.predict(features_df)
+                    inference_start = time.monotonic()
+                    with tracer.span("model_predict"):
+                        predicted_minutes, confidence = self.model.predict(features_df)
+                    self.record_inference_time(time.monotonic() - inference_start)
                     method = "ml_model"
                     
                     # Sanity check: If ML predicts crazy low/high, fallback?
@@ -92,50 +187,111 @@ class PredictionService:
                 confidence = 0.4
                 method = "rule_based_fallback_no_model"
                 
-            # 4. Final adjustments
-            # Rush hour check for response flag
-            hour = datetime.now().hour
-            is_rush = (11 <= hour <= 13) or (16 <= hour <= 17)
-            
-            # Calculate timestamp
-            from datetime import timedelta
-            predicted_time = start_time + timedelta(minutes=predicted_minutes)
-            
-            # 5. Log prediction (Fire and forget, or background task)
-            # We'll just log to console or DB asynchronously if possible.
-            # In FastAPI, best to use BackgroundTasks passed from controller, but here we are in service.
-            # We'll run in threadpool to not block response.
-            log_data = {
-                "order_id": request_data.order_id, # Might be None for pre-prediction
-                "predicted_ready_time": predicted_time.isoformat(),
-                "actual_ready_time": None,
-                "error_minutes": None,
-                "created_at": datetime.now().isoformat()
-            }
-            if request_data.order_id: # Only log if it's a real order
-                run_in_threadpool(supabase_service.log_prediction, log_data)
-                # Also update order table
-                run_in_threadpool(supabase_service.update_order_prediction, 
-                                request_data.order_id, 
-                                predicted_time.isoformat(), 
-                                confidence)
-
-            return {
-                "predicted_ready_time": predicted_time.isoformat(),
-                "confidence": confidence,
-                "estimated_minutes": float(predicted_minutes),
-                "queue_position": vendor_load + 1,
-                "method": method,
-                "rush_detected": is_rush
-            }
+            # Challenger scoring happens off the hot path; this only enqueues
+            with tracer.span("shadow_submit"):
+                shadow_service.submit(request_data.order_id, features_df, predicted_minutes, method, start_time)
+
+            with tracer.span("build_response"):
+                return self.build_response(request_data, start_time, predicted_minutes, confidence, method, vendor_load)
             
         except Exception as e:
             logger.error(f"Critical error in prediction service: {e}")
             raise e
+        finally:
+            self.inflight -= 1
+
+    async def fetch_context(self, vendor_id):
+        """
+        Fetch (vendor_load, recent_velocity), sharing one in-flight fetch per vendor.
+        The result refreshes the context cache even if the caller already gave up.
+        """
+        task = self.pending_fetches.get(vendor_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_context(vendor_id))
+            self.pending_fetches[vendor_id] = task
+            task.add_done_callback(lambda _: self.pending_fetches.pop(vendor_id, None))
+        return await task
+
+    async def _fetch_context(self, vendor_id):
+        vendor_load, recent_velocity = await asyncio.gather(
+            self._traced_threadpool_call("get_vendor_load", supabase_service.get_vendor_load, vendor_id),
+            self._traced_threadpool_call("get_recent_order_velocity", supabase_service.get_recent_order_velocity, vendor_id)
+        )
+        self.context_cache[vendor_id] = (vendor_load, recent_velocity)
+        return vendor_load, recent_velocity
+
+    @staticmethod
+    async def _traced_threadpool_call(name, func, *args):
+        # Span covers the threadpool hop as well as the call itself
+        with tracer.span(name):
+            return await run_in_threadpool(func, *args)
+
+    def should_probe_inference(self):
+        """
+        True at most once per INFERENCE_PROBE_INTERVAL_SECONDS; lets the model run despite
+        the estimate so a single stall cannot lock the service into degraded mode.
+        """
+        now = time.monotonic()
+        if now - self.last_inference_probe >= self.INFERENCE_PROBE_INTERVAL_SECONDS:
+            self.last_inference_probe = now
+            return True
+        return False
+
+    def record_inference_time(self, seconds, alpha=0.2):
+        self.inference_seconds_ewma = alpha * seconds + (1 - alpha) * self.inference_seconds_ewma
+
+    def degraded_prediction(self, request_data, start_time, method):
+        """
+        Immediate answer from cached context and rules; no IO, no model call.
+        """
+        cached = self.context_cache.get(request_data.vendor_id)
+        vendor_load = cached[0] if cached else 0
+        predicted_minutes = self.calculate_rule_based(request_data, vendor_load)
+        confidence = 0.3 if cached else 0.2
+        return self.build_response(request_data, start_time, predicted_minutes, confidence, method, vendor_load)
+
+    def build_response(self, request_data, start_time, predicted_minutes, confidence, method, vendor_load):
+        # 4. Final adjustments
+        # Rush hour check for response flag
+        hour = datetime.now().hour
+        is_rush = (LUNCH_RUSH_HOURS[0] <= hour <= LUNCH_RUSH_HOURS[1]) or \
+            (DINNER_RUSH_HOURS[0] <= hour <= DINNER_RUSH_HOURS[1])
+        
+        # Calculate timestamp
+        from datetime import timedelta
+        predicted_time = start_time + timedelta(minutes=predicted_minutes)
+        
+        # 5. Log prediction (Fire and forget, or background task)
+        # We'll just log to console or DB asynchronously if possible.
+        # In FastAPI, best to use BackgroundTasks passed from controller, but here we are in service.
+        # We'll run in threadpool to not block response.
+        log_data = {
+            "order_id": request_data.order_id, # Might be None for pre-prediction
+            "predicted_ready_time": predicted_time.isoformat(),
+            "actual_ready_time": None,
+            "error_minutes": None,
+            "created_at": datetime.now().isoformat()
+        }
+        if request_data.order_id: # Only log if it's a real order
+            run_in_threadpool(supabase_service.log_prediction, log_data)
+            # Also update order table
+            run_in_threadpool(supabase_service.update_order_prediction, 
+                            request_data.order_id, 
+                            predicted_time.isoformat(), 
+                            confidence)
+
+        return {
+            "predicted_ready_time": predicted_time.isoformat(),
+            "confidence": confidence,
+            "estimated_minutes": float(predicted_minutes),
+            "queue_position": vendor_load + 1,
+            "method": method,
+            "rush_detected": is_rush
+        }
 
     def calculate_rule_based(self, request_data, vendor_load):
         """
-        Rule-based fallback calculation.
+        Rule-based fallback calculation. O(1) table lookups, no ML dependency.
         """
         # Base time: sum(item.base * qty)
         # But we need base_prep_time from items. 
@@ -145,13 +301,9 @@ class PredictionService:
              # Fallback if base time missing
              base_time = request_data.total_base_time_minutes 
         
-        # Queue delay
-        queue_delay = vendor_load * 2.5 # 2.5 mins per order in queue
-        
-        # Rush multiplier
-        hour = datetime.now().hour
-        rush_multiplier = 1.4 if 11 <= hour <= 13 else 1.0
-        
-        total_minutes = (base_time + queue_delay) * rush_multiplier
+        # Queue delay and hour-of-week multiplier come from precomputed tables
+        # (calibrated from history, or the 2.5 min/order + 1.4x lunch defaults)
+        with tracer.span("rule_based"):
+            total_minutes = get_fallback_tables().estimate(request_data.vendor_id, base_time, vendor_load)
         return total_minutes
 
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+import queue
+import random
+import threading
+import time
+
+try:
+    import pandas as pd
+    import numpy as np
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+from app.models.feature_engineer import FEATURE_COLUMNS
+from app.models.prediction_model import PredictionModel
+from app.config import settings
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class ShadowService:
+    """
+    Scores a sample of live feature rows with a challenger model, off the request path.
+    /predict only does a non-blocking enqueue; a background thread scores in batches
+    and keeps its own CPU use under SHADOW_CPU_FRACTION. Records are in memory only
+    (bounded by SHADOW_MAX_RECORDS) and do not survive a restart.
+    """
+    def __init__(self):
+        self.challenger = PredictionModel(model_path=settings.CHALLENGER_MODEL_PATH)
+        self.enabled = False
+        self.queue: "queue.Queue" = queue.Queue(maxsize=settings.SHADOW_QUEUE_SIZE)
+        # order_id -> record, oldest evicted first
+        self.records: "OrderedDict[str, Dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.worker: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """
+        Load the challenger and start the scoring thread. No-op without a challenger.
+        """
+        if not settings.CHALLENGER_MODEL_PATH or not HAS_PANDAS:
+            logger.info("Shadow evaluation disabled (no challenger configured).")
+            return False
+        if not self.challenger.load_model():
+            return False
+
+        # Parallelism would defeat the CPU cap
+        if hasattr(self.challenger.model, "set_params"):
+            self.challenger.model.set_params(n_jobs=1)
+
+        self.stop_event.clear()
+        self.worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self.worker.start()
+        self.enabled = True
+        logger.info(f"Shadow evaluation enabled with challenger {settings.CHALLENGER_MODEL_PATH}")
+        return True
+
+    def stop(self):
+        self.enabled = False
+        self.stop_event.set()
+        if self.worker:
+            self.worker.join(timeout=5)
+
+    def submit(self, order_id, features_df, champion_minutes, champion_method, predicted_at: datetime):
+        """
+        Called on the /predict path: sample, then enqueue without blocking.
+        Only the feature values are queued, so the scorer never touches DataFrames per row.
+        """
+        if not self.enabled or not order_id or random.random() >= settings.SHADOW_SAMPLE_RATE:
+            return
+        features = tuple(features_df[FEATURE_COLUMNS].to_numpy(dtype=float)[0])
+        try:
+            self.queue.put_nowait((order_id, features, champion_minutes, champion_method, predicted_at))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                batch = [self.queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < settings.SHADOW_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.thread_time()
+            try:
+                self._score(batch)
+            except Exception as e:
+                logger.warning(f"Shadow scoring failed for batch of {len(batch)}: {e}")
+
+            # Duty-cycle throttle: idle long enough that busy/(busy+idle) <= SHADOW_CPU_FRACTION
+            busy = time.thread_time() - start
+            fraction = min(max(settings.SHADOW_CPU_FRACTION, 0.01), 1.0)
+            self.stop_event.wait(busy * (1 - fraction) / fraction)
+
+    def _score(self, batch):
+        # One array per batch; per-row frames + pd.concat held the GIL for milliseconds
+        values = np.array([item[1] for item in batch], dtype=float)
+        features = pd.DataFrame(values, columns=FEATURE_COLUMNS)
+        challenger_minutes = self.challenger.predict_batch(features)
+
+        with self.lock:
+            for (order_id, _, champion_minutes, champion_method, predicted_at), minutes in zip(batch, challenger_minutes):
+                self.records[order_id] = {
+                    "predicted_at": predicted_at,
+                    "champion_minutes": float(champion_minutes),
+                    "champion_method": champion_method,
+                    "challenger_minutes": minutes,
+                    "actual_minutes": None,
+                }
+                self.records.move_to_end(order_id)
+            while len(self.records) > settings.SHADOW_MAX_RECORDS:
+                self.records.popitem(last=False)
+
+    def record_actual(self, order_id: str, actual_ready_time: datetime) -> bool:
+        """
+        Attach the observed ready time to a shadowed order. False if it was not sampled.
+        """
+        with self.lock:
+            record = self.records.get(order_id)
+            if record is None:
+                return False
+            if actual_ready_time.tzinfo is not None:
+                # predicted_at is naive local time
+                actual_ready_time = actual_ready_time.astimezone().replace(tzinfo=None)
+            record["actual_minutes"] = (actual_ready_time - record["predicted_at"]).total_seconds() / 60.0
+            return True
+
+    def get_metrics(self) -> Dict:
+        with self.lock:
+            completed = [r for r in self.records.values() if r["actual_minutes"] is not None]
+            pending = len(self.records) - len(completed)
+
+        metrics = {
+            "enabled": self.enabled,
+            "challenger_model_path": settings.CHALLENGER_MODEL_PATH,
+            "scored": len(completed) + pending,
+            "awaiting_actuals": pending,
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+        }
+        if completed:
+            n = len(completed)
+            metrics["samples"] = n
+            metrics["champion_mae_minutes"] = sum(abs(r["champion_minutes"] - r["actual_minutes"]) for r in completed) / n
+            metrics["challenger_mae_minutes"] = sum(abs(r["challenger_minutes"] - r["actual_minutes"]) for r in completed) / n
+            metrics["challenger_wins"] = sum(
+                abs(r["challenger_minutes"] - r["actual_minutes"]) < abs(r["champion_minutes"] - r["actual_minutes"])
+                for r in completed
+            )
+        return metrics
+
+shadow_service = ShadowService()
@@ -1,6 +1,7 @@
 from app.database.supabase_client import supabase_service
 from app.models.feature_engineer import feature_engineer
 from app.models.prediction_model import prediction_model
+from app.models.fallback_tables import FallbackTables, set_fallback_tables
 from app.utils.logger import setup_logger
 import pandas as pd
 from typing import Dict
@@ -11,12 +12,12 @@ class TrainingService:
     def __init__(self):
         self.metrics: Dict = {}
         
-    def train_model(self):
+    def train_model(self, tune: bool = False):
         """
         Execute full training pipeline.
-        1. Fetch data.
+        1. Fetch data (and calibrate the rule-based fallback tables).
         2. Preprocess.
-        3. Train.
+        3. Train (or run the hyperparameter search when tune=True).
         4. Update metrics.
         """
         logger.info("Starting training pipeline...")
@@ -28,6 +29,19 @@ class TrainingService:
                 logger.warning("No training data found. Aborting training.")
                 return {"status": "failed", "reason": "no_data"}
                 
+            # 1b. Calibrate rule-based fallback tables (independent of the ML model)
+            try:
+                # Fit off to the side, then swap in: requests keep reading the old tables meanwhile
+                tables = FallbackTables()
+                calibration = tables.fit(raw_data)
+                if calibration.get("status") == "success":
+                    tables.save()
+                    set_fallback_tables(tables)
+            except Exception as e:
+                logger.warning(f"Fallback table calibration failed: {e}")
+                calibration = {"status": "error", "message": str(e)}
+            self.metrics["fallback_calibration"] = calibration
+                
             # 2. Preprocess
             X, y = feature_engineer.preprocess_training_data(raw_data)
             
@@ -36,10 +50,10 @@ class TrainingService:
                 return {"status": "failed", "reason": "empty_features"}
                 
             # 3. Train
-            metrics = prediction_model.train(X, y)
+            metrics = prediction_model.tune(X, y) if tune else prediction_model.train(X, y)
             
             # 4. Update in-memory metrics
-            self.metrics = metrics
+            self.metrics = {**metrics, "fallback_calibration": calibration}
             self.metrics["last_trained"] = pd.Timestamp.now().isoformat()
             
             logger.info("Training completed successfully.")
@@ -0,0 +1,169 @@
+import contextvars
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler. While a session runs, a daemon thread snapshots every
+    thread's stack each interval and counts collapsed stacks (flamegraph.pl / speedscope
+    format). When no session runs there is no thread and nothing on the request path.
+    """
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.005
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: float, interval_ms: float = 5.0) -> bool:
+        if self.running:
+            return False
+        self.counts = Counter()
+        self.samples = 0
+        self.interval = interval_ms / 1000.0
+        self.duration = seconds
+        self.started_at = time.time()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self.thread.start()
+        logger.info(f"Sampling profiler started for {seconds}s at {interval_ms}ms intervals")
+        return True
+
+    def stop(self) -> bool:
+        """
+        End the current session early. False if none was running.
+        """
+        if not self.running:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        return True
+
+    def _run(self, seconds: float):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                # Line number on the leaf only, so callers merge into one flamegraph node
+                # however many call sites they are sampled at
+                code = frame.f_code
+                stack = [f"{code.co_filename}:{code.co_name}:{frame.f_lineno}"]
+                frame = frame.f_back
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename}:{code.co_name}")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+        logger.info(f"Sampling profiler finished: {self.samples} samples, {len(self.counts)} unique stacks")
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "samples": self.samples,
+            "unique_stacks": len(self.counts),
+        }
+
+class _Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.children: List["_Span"] = []
+
+    def to_dict(self, origin: float) -> Dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(((self.end or time.perf_counter()) - self.start) * 1000, 3),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+class _NoopSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class _SpanContext:
+    __slots__ = ("tracer", "span", "token", "root")
+
+    def __init__(self, tracer, span, root):
+        self.tracer = tracer
+        self.span = span
+        self.root = root
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.span.end = time.perf_counter()
+        _current_span.reset(self.token)
+        if self.root:
+            self.tracer.finished.append(self.span.to_dict(self.span.start))
+        return False
+
+class Tracer:
+    """
+    Per-request span tracing for a sample of requests. Unsampled requests pay one
+    ContextVar lookup per span; with sample_rate 0 (the default) trace() returns a no-op.
+    """
+    def __init__(self, max_traces: int = 100):
+        self.sample_rate = 0.0
+        self.finished: deque = deque(maxlen=max_traces)
+
+    def trace(self, name: str):
+        """
+        Start a root span for a request, if sampled.
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return _NOOP
+        return _SpanContext(self, _Span(name), root=True)
+
+    def span(self, name: str):
+        """
+        Nested span under the current trace; no-op when the request is not traced.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return _NOOP
+        span = _Span(name)
+        parent.children.append(span)
+        return _SpanContext(self, span, root=False)
+
+    def configure(self, sample_rate: float, max_traces: int = None):
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if max_traces and max_traces != self.finished.maxlen:
+            self.finished = deque(self.finished, maxlen=max_traces)
+
+    def traces(self) -> List[Dict]:
+        return list(self.finished)
+
+profiler = SamplingProfiler()
+tracer = Tracer()
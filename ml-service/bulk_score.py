@@ -0,0 +1,158 @@
+"""
+Offline bulk scoring / replay of historical orders.
+
+Streams orders from a CSV, Parquet or JSON-lines snapshot in chunks, builds features with
+FeatureEngineer.create_features_batch and scores them with PredictionModel.predict_batch
+across a process pool. Results are appended to the output file as each chunk finishes, and
+at most 2 chunks per worker are in flight, so memory stays flat regardless of input size.
+
+Usage:
+    python bulk_score.py orders.parquet scored.csv --model models/prep_time_predictor.pkl
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.getcwd())
+
+from app.config import settings
+from app.models.feature_engineer import feature_engineer
+from app.models.prediction_model import PredictionModel
+from app.utils.logger import setup_logger
+
+logger = setup_logger("bulk_score")
+
+# Per-process model, loaded once by the pool initializer
+_MODEL = None
+
+def _init_worker(model_path):
+    global _MODEL
+    _MODEL = PredictionModel(model_path=model_path)
+    if not _MODEL.load_model():
+        raise RuntimeError(f"Could not load model from {model_path}")
+    # One thread per process; parallelism comes from the pool
+    if hasattr(_MODEL.model, "set_params"):
+        _MODEL.model.set_params(n_jobs=1)
+
+def score_chunk(chunk):
+    features = feature_engineer.create_features_batch(chunk)
+    predicted_minutes = _MODEL.predict_batch(features)
+
+    # Fixed dtypes per column, so every chunk maps to the same output schema
+    # even when an id column happens to be all-null within a chunk
+    scored = pd.DataFrame(index=chunk.index)
+    for column in ("id", "order_id", "vendor_id"):
+        if column in chunk:
+            scored[column] = chunk[column].astype("string")
+    created_at = pd.to_datetime(chunk["created_at"])
+    scored["created_at"] = created_at
+    scored["predicted_minutes"] = predicted_minutes
+    scored["predicted_ready_time"] = created_at + pd.to_timedelta(scored["predicted_minutes"], unit="m")
+    return scored
+
+def read_chunks(path, chunk_size):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif ext == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif ext in (".jsonl", ".json"):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported input format: {ext} (use .csv, .parquet or .jsonl)")
+
+class ChunkWriter:
+    """
+    Appends scored chunks to CSV or Parquet without holding earlier chunks.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.is_parquet = path.lower().endswith(".parquet")
+        self.parquet_writer = None
+        self.header_written = False
+
+    def write(self, df):
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self.parquet_writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Later chunks must match the file schema, not their own inferred one
+                table = pa.Table.from_pandas(df, schema=self.parquet_writer.schema, preserve_index=False)
+            self.parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self.header_written else "w",
+                      header=not self.header_written, index=False)
+            self.header_written = True
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+def run_bulk_scoring(input_path, output_path, model_path, chunk_size, workers):
+    # Fail fast here; a bad path inside the pool initializer only shows up as BrokenProcessPool
+    if not PredictionModel(model_path=model_path).load_model():
+        raise RuntimeError(f"Could not load model from {model_path}")
+
+    writer = ChunkWriter(output_path)
+    in_flight = deque()
+    rows = 0
+    start = time.perf_counter()
+
+    def drain_one():
+        nonlocal rows
+        scored = in_flight.popleft().result()
+        writer.write(scored)
+        rows += len(scored)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Scored {rows} rows ({rows / elapsed:.0f} rows/s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path,)) as pool:
+            for chunk in read_chunks(input_path, chunk_size):
+                # Backpressure: bounded in-flight chunks keep memory constant
+                if len(in_flight) >= 2 * workers:
+                    drain_one()
+                in_flight.append(pool.submit(score_chunk, chunk))
+            while in_flight:
+                drain_one()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "output": output_path,
+    }
+    logger.info(f"Bulk scoring finished: {summary}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Score historical orders in bulk.")
+    parser.add_argument("input", help="Orders snapshot (.csv, .parquet or .jsonl); needs created_at")
+    parser.add_argument("output", help="Output file (.csv or .parquet)")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Model to score with")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    try:
+        run_bulk_scoring(args.input, args.output, args.model, args.chunk_size, args.workers)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import bulk_score
+from app.models.feature_engineer import FEATURE_COLUMNS
+
+class StubModel:
+    """
+    Stands in for PredictionModel: predicts the order's base time.
+    """
+    def predict_batch(self, X):
+        assert list(X.columns) == FEATURE_COLUMNS
+        return [max(float(b), 1.0) for b in X["total_base_time_minutes"]]
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch):
+    monkeypatch.setattr(bulk_score, "_MODEL", StubModel())
+
+def orders(ids, start="2026-10-19 11:00"):
+    return pd.DataFrame({
+        "id": ids,
+        "vendor_id": ["v1"] * len(ids),
+        "created_at": pd.date_range(start, periods=len(ids), freq="h"),
+        "total_base_time_minutes": [10.0] * len(ids),
+    })
+
+def test_score_chunk_adds_predictions():
+    scored = bulk_score.score_chunk(orders(["a", "b"]))
+
+    assert list(scored["id"]) == ["a", "b"]
+    assert list(scored["predicted_minutes"]) == [10.0, 10.0]
+    assert scored["predicted_ready_time"].iloc[0] == pd.Timestamp("2026-10-19 11:10")
+
+def test_score_chunk_uses_local_time_for_aware_timestamps():
+    chunk = orders(["a"])
+    chunk["created_at"] = chunk["created_at"].dt.tz_localize("UTC")
+    expected_hour = chunk["created_at"].iloc[0].to_pydatetime().astimezone().hour
+
+    features = bulk_score.feature_engineer.create_features_batch(chunk)
+
+    assert features["hour_of_day"].iloc[0] == expected_hour
+
+def test_parquet_output_survives_all_null_id_chunk(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "scored.parquet")
+    writer = bulk_score.ChunkWriter(path)
+
+    writer.write(bulk_score.score_chunk(orders(["a", "b"])))
+    # A chunk whose ids are all null must still match the file schema
+    writer.write(bulk_score.score_chunk(orders([None, None], start="2026-10-19 13:00")))
+    writer.close()
+
+    result = pd.read_parquet(path)
+    assert len(result) == 4
+    assert list(result["id"][:2]) == ["a", "b"]
+    assert result["id"][2:].isna().all()
+
+def test_parquet_output_survives_all_null_first_chunk(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "scored.parquet")
+    writer = bulk_score.ChunkWriter(path)
+
+    writer.write(bulk_score.score_chunk(orders([None, None])))
+    writer.write(bulk_score.score_chunk(orders(["a", "b"], start="2026-10-19 13:00")))
+    writer.close()
+
+    assert list(pd.read_parquet(path)["id"][2:]) == ["a", "b"]
+
+def test_csv_output_writes_header_once(tmp_path):
+    path = str(tmp_path / "scored.csv")
+    writer = bulk_score.ChunkWriter(path)
+
+    writer.write(bulk_score.score_chunk(orders(["a"])))
+    writer.write(bulk_score.score_chunk(orders(["b"])))
+    writer.close()
+
+    assert list(pd.read_csv(path)["id"]) == ["a", "b"]
+
+def test_bad_model_path_fails_before_starting_pool(tmp_path):
+    with pytest.raises(RuntimeError, match="Could not load model"):
+        bulk_score.run_bulk_scoring(str(tmp_path / "in.csv"), str(tmp_path / "out.csv"),
+                                    str(tmp_path / "missing.pkl"), chunk_size=10, workers=1)
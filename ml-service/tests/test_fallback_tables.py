@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.fallback_tables import FallbackTables, QUEUE_SLOTS, rebuild_queue_depth
+
+MONDAY_NOON = datetime(2026, 10, 19, 12)
+MONDAY_MORNING = datetime(2026, 10, 19, 9)
+
+def synthetic_history(n, vendor_ids, minutes_per_slot=3.0, lunch_multiplier=1.5, seed=0):
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(seed)
+    created_at = [datetime(2026, 9, 7) + timedelta(minutes=int(m)) for m in rng.integers(0, 7 * 24 * 60, n)]
+    hours = np.array([t.hour for t in created_at])
+    base = rng.uniform(2, 15, n)
+    depth = rng.integers(0, 11, n)
+    multiplier = np.where((hours >= 11) & (hours <= 13), lunch_multiplier, 1.0)
+    noise = rng.lognormal(0, 0.05, n)
+    return pd.DataFrame({
+        "vendor_id": rng.choice(vendor_ids, n),
+        "created_at": created_at,
+        "total_base_time_minutes": base,
+        "vendor_queue_depth": depth,
+        "actual_minutes": (base + minutes_per_slot * depth) * multiplier * noise,
+    })
+
+def test_default_tables_reproduce_original_rules():
+    tables = FallbackTables()
+    # (base + 2.5 min per queued order) * 1.4 during 11-13h
+    assert tables.estimate("any", 10.0, 3, MONDAY_NOON) == pytest.approx((10 + 7.5) * 1.4)
+    assert tables.estimate("any", 10.0, 3, MONDAY_MORNING) == pytest.approx(17.5)
+    # Depths past the table are extrapolated at the same per-slot rate
+    assert tables.estimate("any", 10.0, QUEUE_SLOTS + 10, MONDAY_MORNING) == pytest.approx(10 + 2.5 * (QUEUE_SLOTS + 10))
+
+def test_fit_recovers_queue_delay_and_lunch_multiplier():
+    history = synthetic_history(30000, ["v1", "v2"])
+    tables = FallbackTables()
+
+    report = tables.fit(history)
+
+    assert report["status"] == "success"
+    per_slot = [b - a for a, b in zip(tables.queue_delays[:10], tables.queue_delays[1:11])]
+    assert sum(per_slot) / len(per_slot) == pytest.approx(3.0, abs=0.15)
+    assert tables.hour_multipliers[12] == pytest.approx(1.5, abs=0.05)
+    assert tables.hour_multipliers[9] == pytest.approx(1.0, abs=0.05)
+    # More orders ahead never means less waiting
+    assert all(b >= a for a, b in zip(tables.queue_delays, tables.queue_delays[1:]))
+    assert all(0.5 <= m <= 3.0 for m in tables.hour_multipliers)
+
+def test_sparse_vendor_falls_back_to_global_tables():
+    pd = pytest.importorskip("pandas")
+    history = pd.concat([
+        synthetic_history(20000, ["busy"]),
+        synthetic_history(5, ["sparse"], minutes_per_slot=20.0, seed=1),
+    ], ignore_index=True)
+    tables = FallbackTables()
+
+    tables.fit(history)
+
+    assert "busy" in tables.vendor_queue_delays
+    assert "sparse" not in tables.vendor_queue_delays
+    assert "sparse" not in tables.vendor_hour_multipliers
+    assert tables.estimate("sparse", 10.0, 3, MONDAY_NOON) == tables.estimate("unknown", 10.0, 3, MONDAY_NOON)
+
+def test_fit_with_too_little_data_keeps_tables():
+    history = synthetic_history(5, ["v1"])
+    tables = FallbackTables()
+
+    report = tables.fit(history)
+
+    assert report["status"] == "skipped"
+    assert not tables.calibrated
+    assert tables.estimate("v1", 10.0, 3, MONDAY_NOON) == pytest.approx((10 + 7.5) * 1.4)
+
+def test_save_load_round_trip(tmp_path):
+    history = synthetic_history(5000, ["v1"])
+    path = str(tmp_path / "tables.json")
+    fitted = FallbackTables(path=path)
+    fitted.fit(history)
+    fitted.save()
+
+    loaded = FallbackTables(path=path)
+
+    assert loaded.load()
+    assert loaded.calibrated
+    assert loaded.hour_multipliers == fitted.hour_multipliers
+    assert loaded.queue_delays == fitted.queue_delays
+    assert loaded.vendor_hour_multipliers == fitted.vendor_hour_multipliers
+    assert loaded.vendor_queue_delays == fitted.vendor_queue_delays
+    assert loaded.estimate("v1", 10.0, 4, MONDAY_NOON) == fitted.estimate("v1", 10.0, 4, MONDAY_NOON)
+
+def test_load_missing_file_keeps_defaults(tmp_path):
+    tables = FallbackTables(path=str(tmp_path / "missing.json"))
+
+    assert not tables.load()
+    assert not tables.calibrated
+
+def orders_history(n, seed=0):
+    """
+    Rows shaped like the orders table: no feature columns, UTC timestamps as strings.
+    """
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(seed)
+    created_at = pd.Timestamp("2026-09-07", tz="UTC") + pd.to_timedelta(np.sort(rng.integers(0, 7 * 24 * 60, n)), unit="m")
+    base = rng.integers(2, 15, n)
+    ready_at = created_at + pd.to_timedelta(base * rng.uniform(1.0, 2.0, n), unit="m")
+    return pd.DataFrame({
+        "id": [f"o{i}" for i in range(n)],
+        "vendor_id": rng.choice(["v1", "v2"], n),
+        "status": "collected",
+        "created_at": [t.isoformat() for t in created_at],
+        "actual_ready_time": [t.isoformat() for t in ready_at],
+        "items": [[{"menu_item_id": "m1", "quantity": 1, "base_preparation_time_minutes": float(b)}] for b in base],
+    })
+
+def test_rebuild_queue_depth_counts_earlier_unfinished_orders():
+    pd = pytest.importorskip("pandas")
+    t = pd.Timestamp("2026-10-19 12:00")
+    minutes = lambda values: pd.Series([t + pd.Timedelta(minutes=m) for m in values])
+    vendor_ids = pd.Series(["a", "a", "a", "b"])
+
+    # a0 ready at 12:10, a1 at 12:03, a2 placed at 12:05; b0 placed at 12:04 for another vendor
+    depth = rebuild_queue_depth(vendor_ids, minutes([0, 1, 5, 4]), minutes([10, 3, 8, 20]))
+
+    assert list(depth) == [0, 1, 1, 0]
+
+def test_fit_on_order_rows_without_feature_columns():
+    history = orders_history(2000)
+    tables = FallbackTables()
+
+    report = tables.fit(history)
+
+    assert report["status"] == "success"
+    assert report["samples"] == 2000
+    assert tables.calibrated
+    assert set(tables.vendor_queue_delays) == {"v1", "v2"}
+
+def test_fit_buckets_utc_timestamps_by_local_hour(monkeypatch):
+    pd = pytest.importorskip("pandas")
+    time = pytest.importorskip("time")
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "Asia/Kolkata")  # UTC+05:30, no DST
+    time.tzset()
+    try:
+        # Monday 06:30 UTC is 12:00 local; those orders take exactly their base time
+        created_at = [pd.Timestamp("2026-10-19 06:30", tz="UTC") + pd.Timedelta(weeks=w, seconds=s)
+                      for w in range(4) for s in range(100)]
+        history = pd.DataFrame({
+            "vendor_id": "v1",
+            "created_at": [t.isoformat() for t in created_at],
+            "actual_ready_time": [(t + pd.Timedelta(minutes=10)).isoformat() for t in created_at],
+            "total_base_time_minutes": 10.0,
+            "vendor_queue_depth": 0,
+        })
+        tables = FallbackTables()
+
+        assert tables.fit(history)["status"] == "success"
+
+        # The default 1.4x lunch multiplier is corrected in the local noon bucket
+        assert tables.hour_multipliers[12] == pytest.approx(1.0, abs=0.05)
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from app.models.hyperparameter_search import HyperparameterSearch
+
+def candidate(trial_id, mae, inference_ms, n_trees):
+    return {"trial_id": trial_id, "mae": mae, "inference_ms": inference_ms, "n_trees": n_trees}
+
+def test_select_prefers_cheapest_candidate_meeting_target():
+    search = HyperparameterSearch(target_mae_minutes=3.0)
+    results = [
+        candidate(0, mae=2.0, inference_ms=0.9, n_trees=400),
+        candidate(1, mae=2.9, inference_ms=0.2, n_trees=60),
+        candidate(2, mae=3.5, inference_ms=0.1, n_trees=20),
+    ]
+
+    # Trial 2 is cheaper still, but misses the target
+    assert search.select(results)["trial_id"] == 1
+
+def test_select_falls_back_to_most_accurate():
+    search = HyperparameterSearch(target_mae_minutes=1.0)
+    results = [
+        candidate(0, mae=2.0, inference_ms=0.9, n_trees=400),
+        candidate(1, mae=2.9, inference_ms=0.2, n_trees=60),
+    ]
+
+    assert search.select(results)["trial_id"] == 0
+
+def test_time_ordered_split_holds_out_newest_rows():
+    pd = pytest.importorskip("pandas")
+    X = pd.DataFrame({"minute": range(10)})
+    y = pd.Series(range(10))
+
+    X_train, y_train, X_val, y_val = HyperparameterSearch().time_ordered_split(X, y)
+
+    assert list(X_train["minute"]) == list(range(8))
+    assert list(X_val["minute"]) == [8, 9]
+    assert list(y_val) == [8, 9]
+
+def test_run_stops_at_budget():
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("xgboost")
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 1, (20000, 8)), columns=[f"f{i}" for i in range(8)])
+    y = pd.Series(X.sum(axis=1) * 5 + rng.normal(0, 1, len(X)))
+    search = HyperparameterSearch(budget_seconds=1, n_workers=2, n_trials=6, min_estimators=5000)
+
+    start = time.monotonic()
+    result = search.run(X, y)
+    elapsed = time.monotonic() - start
+
+    assert result["budget_exhausted"]
+    # Slack covers spawning the workers and the boosting round in flight at the deadline
+    assert elapsed < search.budget_seconds + 10
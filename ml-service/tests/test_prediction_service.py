@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from app.config import settings
+from app.services import prediction_service as prediction_service_module
+from app.services.prediction_service import PredictionService
+
+class Item(SimpleNamespace):
+    def dict(self):
+        return dict(vars(self))
+
+def make_request():
+    return SimpleNamespace(
+        order_id=None,
+        vendor_id="vendor_123",
+        items=[Item(menu_item_id="item1", quantity=1,
+                    base_preparation_time_minutes=10.0, preparation_complexity=2)],
+        total_base_time_minutes=10.0,
+        max_complexity=2,
+        total_items=1,
+    )
+
+class FakeClock:
+    """
+    Replaces the service module's `time`; only monotonic() is used there.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class StallingModel:
+    """
+    Stands in for PredictionModel: the first call stalls, later calls are instant.
+    """
+    def __init__(self, clock, stall_seconds):
+        self.model = object()
+        self.clock = clock
+        self.stall_seconds = stall_seconds
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        if self.calls == 1:
+            self.clock.advance(self.stall_seconds)
+        return 12.0, 0.85
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prediction_service_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def service(clock):
+    service = PredictionService()
+    service.deadline_seconds = 0.1
+    service.INFERENCE_PROBE_INTERVAL_SECONDS = 0.05
+
+    async def fetch_context(vendor_id):
+        return 3, 10
+    service.fetch_context = fetch_context
+    return service
+
+def test_recovers_after_inference_stall(service, clock):
+    service.model = StallingModel(clock, stall_seconds=5.0)
+
+    async def run():
+        first = await service.predict(make_request())
+        assert first["method"] == "ml_model"
+        # One stall pushes the estimate far past the whole budget
+        assert service.inference_seconds_ewma > service.deadline_seconds
+
+        methods = []
+        for _ in range(100):
+            methods.append((await service.predict(make_request()))["method"])
+            clock.advance(0.01)
+        return methods
+
+    methods = asyncio.run(run())
+    assert methods[1] == "rule_based_deadline"
+    # Probes every 50ms decay the estimate back under the budget
+    assert methods[-20:] == ["ml_model"] * 20
+    assert service.inference_seconds_ewma < service.deadline_seconds
+
+def test_inference_estimate_cannot_starve_context_fetch(service, clock):
+    service.model = StallingModel(clock, stall_seconds=0.0)
+    service.inference_seconds_ewma = 10.0
+
+    result = asyncio.run(service.predict(make_request()))
+    # Fetch still ran (not the cached-context deadline path) despite the huge estimate
+    assert result["queue_position"] == 4
+
+def test_sheds_to_rules_at_inflight_limit(service, clock):
+    service.model = StallingModel(clock, stall_seconds=0.0)
+    service.context_cache["vendor_123"] = (5, 2)
+    service.inflight = settings.MAX_INFLIGHT_PREDICTIONS
+
+    result = asyncio.run(service.predict(make_request()))
+
+    assert result["method"] == "rule_based_load_shed"
+    assert result["queue_position"] == 6
+    assert service.model.calls == 0
+    assert service.inflight == settings.MAX_INFLIGHT_PREDICTIONS
+
+def test_slow_fetch_serves_cached_context_then_refreshes_cache(service, clock, monkeypatch):
+    service.model = StallingModel(clock, stall_seconds=0.0)
+    # Use the real single-flight fetch, with a vendor-load query that blocks until released
+    del service.fetch_context
+    service.context_cache["vendor_123"] = (5, 2)
+    release = threading.Event()
+
+    def get_vendor_load(vendor_id):
+        release.wait(5)
+        return 7
+    monkeypatch.setattr(prediction_service_module.supabase_service, "get_vendor_load", get_vendor_load)
+    monkeypatch.setattr(prediction_service_module.supabase_service, "get_recent_order_velocity", lambda vendor_id: 4)
+
+    async def run():
+        result = await service.predict(make_request())
+        pending = service.pending_fetches["vendor_123"]
+        release.set()
+        await pending
+        return result
+
+    result = asyncio.run(run())
+
+    assert result["method"] == "rule_based_deadline"
+    assert result["queue_position"] == 6
+    # The abandoned fetch still completed and refreshed the cache
+    assert service.context_cache["vendor_123"] == (7, 4)
+    assert "vendor_123" not in service.pending_fetches
@@ -0,0 +1,29 @@
+import threading
+import time
+
+from app.utils.profiler import SamplingProfiler
+
+def test_collapsed_stacks_keep_line_number_on_leaf_only():
+    release = threading.Event()
+
+    def waiting_worker():
+        release.wait(5)
+
+    worker = threading.Thread(target=waiting_worker)
+    worker.start()
+    profiler = SamplingProfiler()
+    try:
+        profiler.start(seconds=5, interval_ms=1)
+        while profiler.samples < 3:
+            time.sleep(0.01)
+        profiler.stop()
+    finally:
+        release.set()
+        worker.join()
+
+    stacks = [line.rsplit(" ", 1)[0].split(";") for line in profiler.collapsed().splitlines()]
+    worker_stacks = [s for s in stacks if any(frame.endswith(":waiting_worker") for frame in s)]
+    assert worker_stacks
+    for stack in worker_stacks:
+        assert not any(frame.rsplit(":", 1)[1].isdigit() for frame in stack[:-1])
+        assert stack[-1].rsplit(":", 1)[1].isdigit()
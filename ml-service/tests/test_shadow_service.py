@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from app.config import settings
+from app.models.feature_engineer import FEATURE_COLUMNS, feature_engineer
+from app.services.shadow_service import ShadowService
+
+PREDICTED_AT = datetime(2026, 10, 19, 12, 0)
+
+class StubChallenger:
+    """
+    Stands in for PredictionModel: predicts base time plus 1 minute per queued order.
+    """
+    def __init__(self):
+        self.model = object()
+        self.batches = []
+
+    def predict_batch(self, X):
+        self.batches.append(X)
+        return [float(b + d) for b, d in zip(X["total_base_time_minutes"], X["vendor_queue_depth"])]
+
+@pytest.fixture
+def shadow(monkeypatch):
+    monkeypatch.setattr(settings, "SHADOW_SAMPLE_RATE", 1.0)
+    shadow = ShadowService()
+    shadow.challenger = StubChallenger()
+    shadow.enabled = True
+    return shadow
+
+def features(base_time, queue_depth):
+    items = [{"base_preparation_time_minutes": base_time, "quantity": 1, "preparation_complexity": 2}]
+    metrics = {"avg_order_fulfillment_rate": 2.0, "max_concurrent_orders": 10}
+    return feature_engineer.create_features_for_prediction(items, queue_depth, metrics, 0)
+
+def drain(shadow):
+    batch = []
+    while not shadow.queue.empty():
+        batch.append(shadow.queue.get_nowait())
+    return batch
+
+def test_challenger_scores_batch_and_compares_on_actuals(shadow):
+    shadow.submit("o1", features(10.0, 2), 15.0, "ml_model", PREDICTED_AT)
+    shadow.submit("o2", features(20.0, 0), 18.0, "ml_model", PREDICTED_AT)
+    shadow.submit(None, features(5.0, 0), 5.0, "ml_model", PREDICTED_AT)  # no order id: not shadowed
+
+    shadow._score(drain(shadow))
+
+    # One frame for the whole batch, in training column order
+    assert len(shadow.challenger.batches) == 1
+    assert list(shadow.challenger.batches[0].columns) == FEATURE_COLUMNS
+    assert shadow.records["o1"]["challenger_minutes"] == 12.0
+    assert shadow.get_metrics()["awaiting_actuals"] == 2
+
+    assert shadow.record_actual("o1", PREDICTED_AT + timedelta(minutes=13))
+    # Aware timestamps are compared in local time, like predicted_at
+    local_tz = PREDICTED_AT.astimezone().tzinfo
+    assert shadow.record_actual("o2", (PREDICTED_AT + timedelta(minutes=19)).replace(tzinfo=local_tz).astimezone(timezone.utc))
+    assert not shadow.record_actual("missing", PREDICTED_AT)
+
+    metrics = shadow.get_metrics()
+    assert metrics["samples"] == 2
+    assert metrics["awaiting_actuals"] == 0
+    assert metrics["champion_mae_minutes"] == pytest.approx((2.0 + 1.0) / 2)
+    assert metrics["challenger_mae_minutes"] == pytest.approx((1.0 + 1.0) / 2)
+    assert metrics["challenger_wins"] == 1
+
+def test_full_queue_drops_instead_of_blocking(shadow):
+    shadow.queue.maxsize = 1
+
+    shadow.submit("o1", features(10.0, 0), 10.0, "ml_model", PREDICTED_AT)
+    shadow.submit("o2", features(10.0, 0), 10.0, "ml_model", PREDICTED_AT)
+
+    assert shadow.queue.qsize() == 1
+    assert shadow.dropped == 1
@@ -2,6 +2,8 @@ import sys
 import os
 import random
 import logging
+import time
+import asyncio
 # import pandas as pd # Avoid pandas import if missing
 from datetime import datetime, timedelta
 # from unittest.mock import MagicMock, patch # Mocks handled in modules
@@ -12,11 +14,13 @@ os.environ["SUPABASE_URL"] = "https://mock.supabase.co"
 os.environ["SUPABASE_SERVICE_KEY"] = "mock-key"
 os.environ["MODEL_PATH"] = "models/test_model.pkl"
 os.environ["LOG_LEVEL"] = "INFO"
+os.environ["ADMIN_TOKEN"] = "validation-admin-token"
 
 sys.path.append(os.getcwd())
 
 # Import ONLY AFTER env setup
 from app.main import app
+import app.main as main_module
 
 def run_validation():
     print("\n" + "="*60)
@@ -26,7 +30,7 @@ def run_validation():
     client = TestClient(app)
 
     # --- Step 1: Health Check ---
-    print("\n[1/3] Testing Health Endpoint...")
+    print("\n[1/5] Testing Health Endpoint...")
     try:
         response = client.get("/health")
         print(f"   -> Status: {response.status_code}")
@@ -40,7 +44,7 @@ def run_validation():
         return
 
     # --- Step 2: Test Real-time Prediction (Fallback Logic) ---
-    print("\n[2/3] Testing Prediction Endpoint...")
+    print("\n[2/5] Testing Prediction Endpoint...")
     print("   (Note: Using Rule-Based Fallback logic since ML libs are missing)")
     
     # Case A: Normal Order
@@ -84,6 +88,111 @@ def run_validation():
         print(f"      - Estimated Minutes: {data['estimated_minutes']:.1f}")
         print(f"      - Method Used: {data['method']}")
 
+    # --- Step 3: Readiness probe & warm-up ---
+    print("\n[3/5] Testing Readiness Endpoint...")
+    # No lifespan has run on `client`, so warm-up has not happened yet
+    resp = client.get("/ready")
+    print(f"   -> Before warm-up: {resp.status_code} {resp.json()}")
+    if resp.status_code != 503:
+        print("❌ /ready should return 503 before warm-up!")
+        return
+
+    # Entering the context runs lifespan, which starts warm-up in the background
+    with TestClient(app) as live_client:
+        deadline = time.time() + main_module.settings.WARMUP_TIMEOUT_SECONDS + 5
+        resp = live_client.get("/ready")
+        while resp.status_code != 200 and time.time() < deadline:
+            time.sleep(0.1)
+            resp = live_client.get("/ready")
+        print(f"   -> After warm-up: {resp.status_code} {resp.json()}")
+        if resp.status_code != 200:
+            print("❌ /ready did not flip to 200 after warm-up!")
+            return
+
+    # A warm-up that hangs must still mark the service ready once WARMUP_TIMEOUT_SECONDS passes
+    service = main_module.prediction_service
+    original_warm_up, original_timeout = service.warm_up, main_module.settings.WARMUP_TIMEOUT_SECONDS
+    async def hanging_warm_up(build_request):
+        await asyncio.sleep(3600)
+    try:
+        service.ready = False
+        service.warm_up = hanging_warm_up
+        main_module.settings.WARMUP_TIMEOUT_SECONDS = 1
+        start = time.time()
+        asyncio.run(main_module.warm_up())
+        print(f"   -> Hung warm-up: ready={service.ready} after {time.time() - start:.1f}s")
+        if not service.ready:
+            print("❌ Service not marked ready after WARMUP_TIMEOUT_SECONDS!")
+            return
+    finally:
+        service.warm_up = original_warm_up
+        main_module.settings.WARMUP_TIMEOUT_SECONDS = original_timeout
+
+    # --- Step 4: Shadow evaluation endpoints ---
+    print("\n[4/5] Testing Shadow Endpoints...")
+    admin_headers = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+    actual = {"order_id": "order_unsampled", "actual_ready_time": datetime.now().isoformat()}
+
+    resp = client.post("/shadow/actuals", json=actual)
+    print(f"   -> Actuals without token: {resp.status_code}")
+    if resp.status_code != 403:
+        print("❌ /shadow/actuals must require the admin token!")
+        return
+
+    resp = client.post("/shadow/actuals", json=actual, headers=admin_headers)
+    print(f"   -> Actuals with token: {resp.status_code} {resp.json()}")
+    if resp.status_code != 200 or resp.json()["recorded"]:
+        print("❌ Unsampled order should be accepted but not recorded!")
+        return
+
+    resp = client.get("/shadow/metrics")
+    print(f"   -> Metrics: {resp.status_code} {resp.json()}")
+    if resp.status_code != 200 or "enabled" not in resp.json():
+        print("❌ /shadow/metrics failed!")
+        return
+
+    # --- Step 5: Admin profiling & tracing ---
+    print("\n[5/5] Testing Admin Endpoints...")
+    resp = client.post("/admin/profile?seconds=5")
+    print(f"   -> Profile without token: {resp.status_code}")
+    if resp.status_code != 403:
+        print("❌ /admin/profile must require the admin token!")
+        return
+
+    resp = client.post("/admin/profile?seconds=5", headers={"X-Admin-Token": "tökén".encode("utf-8")})
+    print(f"   -> Profile with non-ASCII token: {resp.status_code}")
+    if resp.status_code != 403:
+        print("❌ Non-ASCII admin token should be rejected with 403!")
+        return
+
+    resp = client.post("/admin/profile?seconds=5", headers=admin_headers)
+    print(f"   -> Start profiler: {resp.status_code}")
+    client.post("/predict", json=payload_normal)
+    running_resp = client.get("/admin/profile", headers=admin_headers)
+    stop_resp = client.delete("/admin/profile", headers=admin_headers)
+    stacks_resp = client.get("/admin/profile", headers=admin_headers)
+    print(f"   -> While running: {running_resp.status_code}, stop: {stop_resp.status_code}, "
+          f"stacks: {stacks_resp.status_code} ({len(stacks_resp.text.splitlines())} stacks)")
+    if resp.status_code != 200 or running_resp.status_code != 409 or \
+            stop_resp.status_code != 200 or stacks_resp.status_code != 200:
+        print("❌ Profiler start/stop/download flow failed!")
+        return
+
+    resp = client.post("/admin/trace?sample_rate=1.0&max_traces=-1", headers=admin_headers)
+    print(f"   -> Trace with max_traces=-1: {resp.status_code}")
+    if resp.status_code != 422:
+        print("❌ Invalid max_traces should be rejected with 422!")
+        return
+
+    client.post("/admin/trace?sample_rate=1.0", headers=admin_headers)
+    client.post("/predict", json=payload_normal)
+    client.post("/admin/trace?sample_rate=0", headers=admin_headers)
+    traces = client.get("/admin/traces", headers=admin_headers).json()
+    print(f"   -> Traces: {len(traces)}, spans: {[c['name'] for c in traces[-1]['children']] if traces else []}")
+    if not traces or traces[-1]["name"] != "predict":
+        print("❌ Sampled /predict request was not traced!")
+        return
+
     print("\n" + "="*60)
     print("✅ VALIDATION COMPLETED SUCCESSFULLY (LITE MODE)")
     print("="*60 + "\n")